@@ -1,18 +1,21 @@
 """Nox sessions."""
 
+import functools
 import os
-import shlex
-import shutil
 import sys
-import tempfile
 from pathlib import Path
 from textwrap import dedent
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
 
 import nox
 
 try:
     from nox_poetry import Session
     from nox_poetry import session
+    from nox_poetry.poetry import CommandSkippedError
 except ImportError:
     message = f"""\
     Nox failed to import the 'nox-poetry' package.
@@ -36,24 +39,300 @@ nox.options.sessions = (
     "docs-build",
 )
 
+# Requirements files exported from poetry.lock, keyed by dependency groups.
+_EXPORT_CACHE: Dict[FrozenSet[str], Path] = {}
 
-def install_poetry_groups(session: Session, *groups: str) -> None:
-    """Install dependencies from poetry groups.
+
+@functools.lru_cache(maxsize=None)
+def _lock_digest() -> str:
+    """Return a digest of the dependencies locked in ``poetry.lock``.
+
+    Only the resolved packages and the content hash of ``pyproject.toml`` are
+    taken into account, so that changes to other metadata, such as the lock
+    file format or the Poetry version in the header, do not invalidate cached
+    requirements. Without a TOML parser in the standard library, the entire
+    file is hashed instead.
+
+    The digest is computed once per Nox invocation, as the lock file is not
+    expected to change while sessions are running.
+    """
+    import hashlib
+    import json
+
+    path = Path("poetry.lock")
+    if sys.version_info >= (3, 11):
+        import tomllib
+
+        with path.open("rb") as io:
+            lock = tomllib.load(io)
+
+        packages = sorted(
+            lock.get("package", []),
+            key=lambda package: (package["name"], package["version"]),
+        )
+        content_hash = lock.get("metadata", {}).get("content-hash")
+        data = json.dumps(
+            [packages, content_hash], sort_keys=True, default=str
+        ).encode()
+    else:
+        data = path.read_bytes()
+
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _lock_cache(name: str) -> Path:
+    """Return the cache directory under ``.nox`` for the current lock file.
+
+    Each cache has one subdirectory per lock file digest. When the lock file
+    changes, the subdirectories for outdated lock files are removed, so that
+    the cache does not grow without bounds.
+
+    Args:
+        name: The name of the cache.
+
+    Returns:
+        The path to the cache directory.
+    """
+    import shutil
+
+    cache = Path(".nox", name)
+    directory = cache / _lock_digest()
+    if not directory.exists() and cache.exists():
+        for path in cache.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def export_poetry_groups(session: Session, *groups: str) -> Path:
+    """Export dependencies from poetry groups to a requirements file.
+
+    Each combination of groups is exported at most once per Nox invocation.
+    The requirements file is stored under ``.nox/_export_cache``, in a
+    directory named after the digest of ``poetry.lock``, so later invocations
+    reuse it as long as the lock file is unchanged.
 
     Using this as a workaround until this PR is merged in:
     https://github.com/cjolowicz/nox-poetry/pull/1080
+
+    Args:
+        session: The Session object.
+        groups: The Poetry dependency groups to export.
+
+    Returns:
+        The path to the requirements file.
+
+    Raises:
+        CommandSkippedError: The export was skipped by Nox.
     """
-    with tempfile.NamedTemporaryFile() as requirements:
-        session.run(
+    key = frozenset(groups)
+    if key in _EXPORT_CACHE:
+        return _EXPORT_CACHE[key]
+
+    path = _lock_cache("_export_cache") / f"{'-'.join(sorted(key))}.txt"
+    if not path.exists():
+        # Poetry writes the output file directly. Export to a temporary name
+        # first, so an interrupted export does not leave a truncated file in
+        # the cache.
+        partial = path.with_suffix(".partial")
+        output = session.run_always(
             "poetry",
             "export",
-            *[f"--only={group}" for group in groups],
+            *[f"--only={group}" for group in sorted(key)],
             "--format=requirements.txt",
             "--without-hashes",
-            f"--output={requirements.name}",
+            f"--output={partial}",
             external=True,
         )
-        session.install("-r", requirements.name)
+        if output is None:
+            raise CommandSkippedError(f"Skipped exporting {', '.join(sorted(key))}")
+        partial.replace(path)
+
+    _EXPORT_CACHE[key] = path
+    return path
+
+
+def _project_mtime() -> int:
+    """Return the most recent modification time of the project sources."""
+    paths = [Path("pyproject.toml"), *Path("src").rglob("*")]
+    return max(
+        path.stat().st_mtime_ns for path in paths if "__pycache__" not in path.parts
+    )
+
+
+def _install_skipped(session: Session) -> bool:
+    """Return whether Nox skips installation commands in the session.
+
+    This is the case when Nox is invoked with ``--no-install`` and the session
+    reuses an existing environment.
+    """
+    runner = session._runner  # noqa: SLF001
+    return bool(
+        getattr(runner.global_config, "no_install", False)
+        and runner.venv is not None
+        and runner.venv._reused  # noqa: SLF001
+    )
+
+
+def ensure_wheelhouse(session: Session, *args: str) -> Path:
+    """Download and build wheels for the given requirements.
+
+    The wheels are stored under ``.nox/_wheelhouse``, in a directory named
+    after the digest of ``poetry.lock``, which is shared between sessions and
+    kept across Nox invocations. Recreated environments can then be populated
+    without network access. A marker file records which requirements have
+    been built for which Python version, so pip only runs when they change.
+
+    Args:
+        session: The Session object.
+        args: The requirements, as passed to ``pip install``.
+
+    Returns:
+        The path to the wheelhouse.
+
+    Raises:
+        CommandSkippedError: Building the wheels was skipped by Nox.
+    """
+    import hashlib
+
+    wheelhouse = _lock_cache("_wheelhouse").absolute()
+    key = repr((session.python, args)).encode()
+    marker = wheelhouse / ".built" / hashlib.blake2b(key, digest_size=16).hexdigest()
+    if marker.exists():
+        return wheelhouse
+
+    constraints = session.poetry.export_requirements()
+    output = session.run_always(
+        "python",
+        "-m",
+        "pip",
+        "wheel",
+        f"--constraint={constraints}",
+        f"--wheel-dir={wheelhouse}",
+        *args,
+        silent=True,
+    )
+    if output is None:
+        raise CommandSkippedError("Skipped building wheels")
+
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    return wheelhouse
+
+
+def install_requirements(session: Session, *args: str) -> None:
+    """Install requirements into the session, constrained by the lock file.
+
+    If uv is available on the ``PATH``, use it instead of pip. Otherwise,
+    install with pip from the wheelhouse.
+
+    Args:
+        session: The Session object.
+        args: The requirements, as passed to ``pip install``.
+    """
+    import shutil
+
+    if shutil.which("uv") is None:
+        wheelhouse = ensure_wheelhouse(session, *args)
+        session.install("--no-index", f"--find-links={wheelhouse}", *args)
+        return
+
+    constraints = session.poetry.export_requirements()
+
+    # uv installs into the environment given by VIRTUAL_ENV, which Nox sets
+    # for the session.
+    session.run_always(
+        "uv",
+        "pip",
+        "install",
+        f"--constraint={constraints}",
+        *args,
+        external=True,
+    )
+
+
+def ensure_env(
+    session: Session,
+    groups: Iterable[str] = (),
+    extras: Iterable[str] = (),
+    include_project: bool = False,
+) -> None:
+    """Install the session dependencies unless they are already up-to-date.
+
+    The installed dependencies are recorded in a marker file inside the
+    session's virtual environment, using a digest of ``poetry.lock``, the
+    requested groups and packages, and the project sources. If the marker
+    matches, installation is skipped. This only has an effect when the
+    environment is reused, for example with ``--reuse-existing-virtualenvs``.
+    If Nox skips the installation, the marker is left unchanged.
+
+    Args:
+        session: The Session object.
+        groups: The Poetry dependency groups to install.
+        extras: Additional packages to install, such as ``pytest``.
+        include_project: Whether to install the project itself.
+    """
+    import hashlib
+
+    if _install_skipped(session):
+        return
+
+    groups, extras = sorted(groups), sorted(extras)
+
+    hasher = hashlib.blake2b(_lock_digest().encode())
+    hasher.update(repr((groups, extras)).encode())
+    if include_project:
+        hasher.update(str(_project_mtime()).encode())
+    digest = hasher.hexdigest()
+
+    location = session.virtualenv.location
+    marker = Path(location, ".env.hash") if location is not None else None
+    if marker is not None and marker.exists() and marker.read_text() == digest:
+        return
+
+    # The project's own dependencies come from the main group, which lets
+    # pip install the project itself without resolving them again.
+    exported = [*groups, "main"] if include_project else groups
+    args = [*extras]
+    try:
+        if exported:
+            requirements = export_poetry_groups(session, *exported)
+            args[:0] = ["-r", str(requirements)]
+
+        # A single installer invocation resolves and installs everything.
+        if args:
+            install_requirements(session, *args)
+    except CommandSkippedError:
+        return
+
+    if include_project:
+        session.install("--no-deps", ".")
+
+    if marker is not None:
+        marker.write_text(digest)
+
+
+def scan_marker(tool: str) -> Path:
+    """Return the marker file for a successful scan of the locked packages.
+
+    The marker is named after the digest of ``poetry.lock`` and the current
+    date, so a scan is repeated when the dependencies change, and at least
+    once a day to pick up newly published advisories.
+
+    Args:
+        tool: The name of the scanner.
+
+    Returns:
+        The path to the marker file.
+    """
+    import time
+
+    date = time.strftime("%Y-%m-%d", time.gmtime())
+    return Path(".nox", f"_{tool}.{_lock_digest()}.{date}.ok")
 
 
 def activate_virtualenv_in_precommit_hooks(session: Session) -> None:
@@ -66,8 +345,19 @@ def activate_virtualenv_in_precommit_hooks(session: Session) -> None:
     Args:
         session: The Session object.
     """
+    import re
+    import shlex
+
     assert session.bin is not None  # noqa: S101
 
+    virtualenv = session.env.get("VIRTUAL_ENV")
+    if virtualenv is None:
+        return
+
+    hookdir = Path(".git") / "hooks"
+    if not hookdir.is_dir():
+        return
+
     # Only patch hooks containing a reference to this session's bindir. Support
     # quoting rules for Python and bash, but strip the outermost quotes so we
     # can detect paths within the bindir, like <bindir>/python.
@@ -76,11 +366,12 @@ def activate_virtualenv_in_precommit_hooks(session: Session) -> None:
         for bindir in (repr(session.bin), shlex.quote(session.bin))
     ]
 
-    virtualenv = session.env.get("VIRTUAL_ENV")
-    if virtualenv is None:
-        return
+    pattern = re.compile(
+        "|".join(map(re.escape, bindirs)),
+        re.IGNORECASE if Path("A") == Path("a") else 0,
+    )
 
-    headers = {
+    templates = {
         # pre-commit < 2.16.0
         "python": f"""\
             import os
@@ -101,35 +392,51 @@ def activate_virtualenv_in_precommit_hooks(session: Session) -> None:
             PATH={shlex.quote(session.bin)}"{os.pathsep}$PATH"
             """,
     }
-
-    hookdir = Path(".git") / "hooks"
-    if not hookdir.is_dir():
-        return
+    headers = {key: dedent(template) for key, template in templates.items()}
 
     for hook in hookdir.iterdir():
         if hook.name.endswith(".sample") or not hook.is_file():
             continue
 
-        if not hook.read_bytes().startswith(b"#!"):
+        # Check the shebang before decoding, as hooks may be binaries.
+        data = hook.read_bytes()
+        if not data.startswith(b"#!"):
             continue
 
-        text = hook.read_text()
-
-        if not any(
-            Path("A") == Path("a") and bindir.lower() in text.lower() or bindir in text
-            for bindir in bindirs
-        ):
+        text = data.decode()
+        if not pattern.search(text):
             continue
 
         lines = text.splitlines()
 
         for executable, header in headers.items():
             if executable in lines[0].lower():
-                lines.insert(1, dedent(header))
+                lines.insert(1, header)
                 hook.write_text("\n".join(lines))
                 break
 
 
+def clean_docs_build(session: Session) -> List[str]:
+    """Remove the documentation build directory if requested.
+
+    Sphinx rebuilds only changed pages when the build directory is kept. Pass
+    ``--clean`` after the ``--`` separator to start from scratch instead.
+
+    Args:
+        session: The Session object.
+
+    Returns:
+        The positional arguments without the ``--clean`` option.
+    """
+    import shutil
+
+    posargs = [arg for arg in session.posargs if arg != "--clean"]
+    if len(posargs) != len(session.posargs):
+        shutil.rmtree(Path("docs", "_build"), ignore_errors=True)
+
+    return posargs
+
+
 @session(name="pre-commit", python=python_versions[0])
 def precommit(session: Session) -> None:
     """Lint using pre-commit."""
@@ -139,7 +446,7 @@ def precommit(session: Session) -> None:
         "--hook-stage=manual",
         "--show-diff-on-failure",
     ]
-    install_poetry_groups(session, "dev")
+    ensure_env(session, groups=["dev"])
     session.run("pre-commit", *args)
     if args and args[0] == "install":
         activate_virtualenv_in_precommit_hooks(session)
@@ -148,29 +455,55 @@ def precommit(session: Session) -> None:
 @session(python=python_versions[0])
 def safety(session: Session) -> None:
     """Scan dependencies for insecure packages."""
+    marker = scan_marker("safety")
+    if marker.exists():
+        session.log("Skipping safety, the locked packages were scanned today.")
+        return
+
     requirements = session.poetry.export_requirements()
-    session.install("safety")
-    session.run("safety", "check", "--full-report", f"--file={requirements}")
+    ensure_env(session, extras=["safety"])
+    # The command is not run if Nox is invoked with --install-only.
+    if session.run("safety", "check", "--full-report", f"--file={requirements}"):
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
 
 
 @session(python=python_versions)
 def mypy(session: Session) -> None:
     """Type-check using mypy."""
-    args = session.posargs or ["src", "tests", "docs/conf.py"]
-    session.install(".")
-    session.install("mypy", "pytest")
-    session.run("mypy", *args)
-    if not session.posargs:
-        session.run("mypy", f"--python-executable={sys.executable}", "noxfile.py")
+    # Install Nox into the session so that a single mypy run can also check
+    # noxfile.py, instead of a second run against the Nox interpreter. The
+    # files to check are listed in pyproject.toml.
+    ensure_env(
+        session,
+        extras=["mypy", "pytest", "nox", "nox-poetry"],
+        include_project=True,
+    )
+    session.run("mypy", *session.posargs)
 
 
 @session(python=python_versions)
 def tests(session: Session) -> None:
     """Run the test suite."""
-    session.install(".")
-    session.install("coverage[toml]", "pytest", "pygments")
+    ensure_env(
+        session,
+        extras=["coverage[toml]", "pytest", "pytest-cov", "pytest-xdist", "pygments"],
+        include_project=True,
+    )
+    # Run tests on all cores with pytest-xdist. Coverage is measured in the
+    # worker processes by pytest-cov, and written to a data file per session
+    # and platform for the coverage session to combine. The platform keeps
+    # the names unique when CI gathers the files from several runners.
     try:
-        session.run("coverage", "run", "--parallel", "-m", "pytest", *session.posargs)
+        session.run(
+            "pytest",
+            "--numprocesses=auto",
+            "--cov",
+            "--cov-report=",
+            "--cov-fail-under=0",
+            *session.posargs,
+            env={"COVERAGE_FILE": f".coverage.{session.name}.{sys.platform}"},
+        )
     finally:
         if session.interactive:
             session.notify("coverage", posargs=[])
@@ -192,8 +525,9 @@ def coverage(session: Session) -> None:
 @session(python=python_versions[0])
 def typeguard(session: Session) -> None:
     """Runtime type checking using Typeguard."""
-    session.install(".")
-    session.install("pytest", "typeguard", "pygments")
+    ensure_env(
+        session, extras=["pytest", "typeguard", "pygments"], include_project=True
+    )
     session.run("pytest", f"--typeguard-packages={package}", *session.posargs)
 
 
@@ -207,37 +541,25 @@ def xdoctest(session: Session) -> None:
         if "FORCE_COLOR" in os.environ:
             args.append("--colored=1")
 
-    session.install(".")
-    session.install("xdoctest[colors]")
+    ensure_env(session, extras=["xdoctest[colors]"], include_project=True)
     session.run("python", "-m", "xdoctest", *args)
 
 
 @session(name="docs-build", python=python_versions[0])
 def docs_build(session: Session) -> None:
     """Build the documentation."""
-    args = session.posargs or ["docs", "docs/_build"]
-    if not session.posargs and "FORCE_COLOR" in os.environ:
+    posargs = clean_docs_build(session)
+    args = posargs or ["docs", "docs/_build"]
+    if not posargs and "FORCE_COLOR" in os.environ:
         args.insert(0, "--color")
 
-    session.install(".")
-    install_poetry_groups(session, "docs")
-
-    build_dir = Path("docs", "_build")
-    if build_dir.exists():
-        shutil.rmtree(build_dir)
-
+    ensure_env(session, groups=["docs"], include_project=True)
     session.run("sphinx-build", *args)
 
 
 @session(python=python_versions[0])
 def docs(session: Session) -> None:
     """Build and serve the documentation with live reloading on file changes."""
-    args = session.posargs or ["--open-browser", "docs", "docs/_build"]
-    session.install(".")
-    install_poetry_groups(session, "docs")
-
-    build_dir = Path("docs", "_build")
-    if build_dir.exists():
-        shutil.rmtree(build_dir)
-
+    args = clean_docs_build(session) or ["--open-browser", "docs", "docs/_build"]
+    ensure_env(session, groups=["docs"], include_project=True)
     session.run("sphinx-autobuild", *args)